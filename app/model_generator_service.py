@@ -5,11 +5,15 @@ STL files from CAD models.
 
 import hashlib
 import io
-import json
 import logging
 import os
+import shutil
 import tempfile
+import threading
 import typing as t
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
 
 import flask
 import pydantic
@@ -32,10 +36,19 @@ STATIC_DIR = "app/static"
 HOST = "0.0.0.0"
 PORT = 80
 
+# Let a web server in front of the service send generated files using the
+# X-Sendfile header instead of reading them in Python. Only enable this when
+# deployed behind a web server supporting X-Sendfile, see the README.
+USE_X_SENDFILE = False
+
 # Global variables holding information about available models
 MODEL_PARAMS = {}
 MODEL_PATHS = {}
 MODELS = []
+# Set of the names in MODELS, used for fast membership checks
+MODELS_SET = frozenset()
+# MODEL_PARAMS serialized as JSON, returned by the /api/models endpoint
+MODELS_JSON = b"{}"
 
 app = flask.Flask(
     import_name=__name__,
@@ -43,6 +56,23 @@ app = flask.Flask(
     static_folder=STATIC_DIR,
     root_path=os.getcwd(),
 )
+app.config["USE_X_SENDFILE"] = USE_X_SENDFILE
+
+# Thread pool used to render preview images in the background, and the names of
+# the images that are currently being rendered
+_RENDER_POOL = ThreadPoolExecutor(max_workers=2)
+_PENDING_RENDERS = set()
+_PENDING_RENDERS_LOCK = threading.Lock()
+
+
+def _read_parameters(path: str) -> dict:
+    """
+    Open a FreeCAD .FCStd model ahead of time so that it is ready for the first
+    mesh generation, and read its default parameters from the opened document.
+    :param path: Path to the FreeCAD .FCStd model
+    """
+    logging.info(f"Preloading {path} and reading its parameters")
+    return freecad.preload_document(path)
 
 
 def initialize_models(cad_model_dir: str = CAD_MODEL_DIR):
@@ -51,61 +81,156 @@ def initialize_models(cad_model_dir: str = CAD_MODEL_DIR):
     global variables of this module.
     :param cad_model_dir: Path to a directory containing FreeCAD .FCStd models
     """
+    global MODELS_SET, MODELS_JSON  # pylint: disable=global-statement
+
     logging.info("Initializing avaiable CAD models")
 
     logging.info(f"Listing models in {cad_model_dir}")
-    for file_name in os.listdir(cad_model_dir):
-        model_name, file_type = os.path.splitext(file_name)
+    suffix = ".FCStd"
+    with os.scandir(cad_model_dir) as entries:
+        for entry in entries:
+            if not entry.name.endswith(suffix) or not entry.is_file():
+                continue
 
-        if file_type != ".FCStd":
-            continue
+            model_name = entry.name[: -len(suffix)]
+            logging.info(f"Found model {model_name} at path {entry.path}")
 
-        path = os.path.join(cad_model_dir, file_name)
-        logging.info(f"Found model {model_name} at path {path}")
-        logging.info(f"Reading parameters from {path}")
-        parameters = freecad.get_parameters(path)
-        MODEL_PARAMS[model_name] = parameters
-        MODEL_PATHS[model_name] = path
-        MODELS.append(model_name)
+            # The models are read one at a time, since the FreeCAD Python
+            # bindings are not thread-safe
+            MODEL_PARAMS[model_name] = _read_parameters(entry.path)
+            MODEL_PATHS[model_name] = entry.path
+            MODELS.append(model_name)
+
+    MODELS_SET = frozenset(MODELS)
+    # Serialized the same way as flask.jsonify, which sorts the keys by default
+    MODELS_JSON = app.json.dumps(MODEL_PARAMS).encode()
 
     logging.info(f"Done initializing {len(MODELS)} models: {MODELS}")
 
 
+def _is_up_to_date(path: str, source_path: str) -> bool:
+    """
+    Check if a generated file exists and is newer than the file it was generated
+    from.
+    :param path: Path to the generated file
+    :param source_path: Path to the file that the generated file was created from
+    """
+    try:
+        return os.path.getmtime(path) >= os.path.getmtime(source_path)
+    except OSError:
+        return False
+
+
+def _param_key(parameters: dict, source_mtime: float) -> str:
+    """
+    Compute a hex digest identifying a set of parameters regardless of their
+    order, together with the modification time of the model they are applied to.
+    The digest names the output files, so an existing output file is up to date
+    by construction. BLAKE2 is fed directly with the parameters, without
+    serializing them, and the digest is long enough that collisions between
+    different inputs can be ruled out in practice.
+    :param parameters: A dictionary of parameters
+    :param source_mtime: Modification time of the model file
+    """
+    param_hash = hashlib.blake2b(digest_size=16)
+    param_hash.update(repr(source_mtime).encode())
+    param_hash.update(b"\x00")
+    for key in sorted(parameters):
+        param_hash.update(key.encode())
+        param_hash.update(b"\x00")
+        param_hash.update(str(parameters[key]).encode())
+        param_hash.update(b"\x00")
+    return param_hash.hexdigest()
+
+
 def generate_model(model: str, parameters: dict):
     """
     Generate a STL mesh from a model with the given parameters.
     :param model: The name of the model
     :param parameters: A dictionary of parameters that will be set in the model
     """
-    if model not in MODELS:
+    if model not in MODELS_SET:
         raise InvalidModelException(f"Input '{model}' must be one of {MODELS}")
 
-    param_str = json.dumps(parameters, sort_keys=True).encode()
-    param_hash = hashlib.sha256(param_str).hexdigest()[:8]
+    model_path = MODEL_PATHS[model]
+    param_hash = _param_key(parameters, os.path.getmtime(model_path))
 
     output_path = f"{OUTPUT_DIR}/{model}_{param_hash}.stl"
 
-    freecad.generate_mesh(
-        input_path=MODEL_PATHS[model],
-        output_path=output_path,
-        parameters=parameters,
-    )
+    # The output path is derived from the parameters and the modification time
+    # of the CAD model, so an existing mesh was generated from the same inputs
+    # and can be reused without opening the model in FreeCAD
+    if os.path.exists(output_path):
+        logging.info(f"Using previously generated mesh at {output_path}")
+        return output_path
+
+    # The mesh is exported to a temporary file that is only moved to the output
+    # path once it is complete. Otherwise a concurrent request could find a
+    # partially written mesh, or a failed export would be reused later.
+    temp_path = f"{OUTPUT_DIR}/.{model}_{param_hash}_{uuid.uuid4().hex}.stl"
+    try:
+        freecad.generate_mesh(
+            input_path=model_path,
+            output_path=temp_path,
+            parameters=parameters,
+        )
+        os.replace(temp_path, output_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
 
     return output_path
 
 
+def _render_image(input_path: str, output_path: str):
+    """
+    Render a preview image of a STL file. Intended to run in the background
+    through _RENDER_POOL, so exceptions are logged instead of raised.
+    :param input_path: Path to the input STL file
+    :param output_path: Path to the output PNG file
+    """
+    # pylint: disable=broad-except
+    # The image is rendered to a temporary file that is only moved to the output
+    # path once it is complete, so that a failed render is not served or reused
+    output_dir, output_filename = os.path.split(output_path)
+    temp_path = os.path.join(output_dir, f".{uuid.uuid4().hex}_{output_filename}")
+    try:
+        openscad.generate_image(
+            input_path=input_path,
+            output_path=temp_path,
+        )
+        os.replace(temp_path, output_path)
+    except Exception:
+        logging.exception(f"Could not render preview image {output_path}")
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        with _PENDING_RENDERS_LOCK:
+            _PENDING_RENDERS.discard(os.path.basename(output_path))
+
+
+# Default values of all variables used by the template, so that the template can
+# rely on every variable being defined
+_RENDER_DEFAULTS = MappingProxyType(
+    {
+        "available_models": None,
+        "selected_model": None,
+        "selected_parameters": None,
+        "download_link": None,
+        "download_text": None,
+        "generated_image": None,
+        "image_ready_link": None,
+        "message": "",
+    }
+)
+
+
 def _render(**kwargs: t.Any):
-    variables = dict(
-        available_models=MODELS,
-        selected_model=None,
-        selected_parameters=None,
-        download_link=None,
-        download_text=None,
-        generated_image=None,
-        message="",
+    return flask.render_template(
+        "model_generator_service.html",
+        **{**_RENDER_DEFAULTS, "available_models": MODELS, **kwargs},
     )
-    variables.update(kwargs)
-    return flask.render_template("model_generator_service.html", **variables)
 
 
 @app.route("/", methods=["GET"])
@@ -152,11 +277,12 @@ def submit_parameters():
     parameters = flask.request.form.to_dict()
     model = parameters.pop("selected_model")
     generated_image = None
+    image_ready_link = None
 
     logging.info(f"Recieved request to generate {model} with parameters {parameters}")
 
     try:
-        assert model in MODELS
+        assert model in MODELS_SET
         output_path = generate_model(model=model, parameters=parameters)
         output_filename = os.path.basename(output_path)
         output_image_filename = f"{os.path.splitext(output_filename)[0]}.png"
@@ -165,10 +291,17 @@ def submit_parameters():
         output_filename = os.path.basename(output_path)
         download_link = f"api/download/{output_filename}"
         download_text = output_filename
-        openscad.generate_image(
-            input_path=output_path,
-            output_path=output_image_path,
-        )
+        # The preview image is only used for display, so it is rendered in the
+        # background and the page polls for it instead of waiting for OpenSCAD
+        if not _is_up_to_date(output_image_path, output_path):
+            image_ready_link = flask.url_for(
+                "image_ready", filename=output_image_filename
+            )
+            with _PENDING_RENDERS_LOCK:
+                pending = output_image_filename in _PENDING_RENDERS
+                _PENDING_RENDERS.add(output_image_filename)
+            if not pending:
+                _RENDER_POOL.submit(_render_image, output_path, output_image_path)
     except Exception as e:
         message = str(e)
 
@@ -178,6 +311,7 @@ def submit_parameters():
         download_link=download_link,
         download_text=download_text,
         generated_image=generated_image,
+        image_ready_link=image_ready_link,
         message=message,
     )
 
@@ -195,7 +329,20 @@ def models():
     """
     API endpoint for getting the available models and parameters
     """
-    return flask.jsonify(MODEL_PARAMS)
+    return flask.Response(MODELS_JSON, mimetype="application/json")
+
+
+@app.route("/api/image_ready/<filename>", methods=["GET"])
+def image_ready(filename: str):
+    """
+    API endpoint for checking if a preview image rendered in the background is
+    ready to be downloaded
+    """
+    filename = os.path.basename(filename)
+    with _PENDING_RENDERS_LOCK:
+        pending = filename in _PENDING_RENDERS
+    ready = not pending and os.path.exists(os.path.join(OUTPUT_DIR, filename))
+    return flask.jsonify({"ready": ready, "pending": pending})
 
 
 @app.route("/api/download/<filename>", methods=["GET"])
@@ -215,11 +362,8 @@ def download(filename: str):
 class GenerationRequest(pydantic.BaseModel):
     """Model generation request passed in the POST requests to the API"""
 
-    # pylint: disable=too-few-public-methods
-    class Config:
-        """Class to disallow extra attributes in the json"""
-
-        extra = "forbid"
+    # Disallow extra attributes in the json
+    model_config = pydantic.ConfigDict(extra="forbid")
 
     model: str
     parameters: t.Dict[str, str]
@@ -228,7 +372,8 @@ class GenerationRequest(pydantic.BaseModel):
 def _generate(request: flask.Request, download_link: bool):
     # pylint: disable=broad-except
     try:
-        req = GenerationRequest(**request.json)
+        # Parse and validate the raw request body in a single pass
+        req = GenerationRequest.model_validate_json(request.get_data(cache=False))
         output_path = generate_model(model=req.model, parameters=req.parameters)
         output_filename = os.path.basename(output_path)
     except Exception as e:
@@ -267,39 +412,73 @@ def generate_download_link():
     return _generate(flask.request, download_link=True)
 
 
+class _TemporaryFile(io.FileIO):
+    """
+    A file opened for reading from a temporary directory, which removes the
+    directory when the file is closed. The WSGI server closes the file once it
+    has been sent, so it can be sent directly from disk without keeping it.
+    """
+
+    def __init__(self, path: str, tempdir: tempfile.TemporaryDirectory):
+        super().__init__(path, "rb")
+        self.tempdir = tempdir
+
+    def close(self):
+        super().close()
+        self.tempdir.cleanup()
+
+
 @app.route("/api/generate_image", methods=["POST"])
 def generate_image():
     """
-    API endpoint for generating a image from a STL file
+    API endpoint for generating a image from a STL file. The file is either sent
+    as the field 'file' in a multipart form, or as the raw request body with its
+    name given by the query parameter 'filename'.
     """
-    file = flask.request.files["file"]
-    input_filename = os.path.basename(file.filename)
+    if flask.request.mimetype == "multipart/form-data":
+        file = flask.request.files["file"]
+        input_filename = file.filename
+        stream = file.stream
+    else:
+        # Reading the raw request body avoids parsing and buffering the upload
+        # as a multipart form before writing it to disk
+        input_filename = flask.request.args.get("filename", "model.stl")
+        stream = flask.request.stream
+
+    # Fall back to a default name if no usable file name was given, since the
+    # name is used as a path in the temporary directory
+    input_filename = os.path.basename(input_filename or "")
+    if input_filename in ("", ".", ".."):
+        input_filename = "model.stl"
     output_filename = f"{os.path.splitext(input_filename)[0]}.png"
 
-    with tempfile.TemporaryDirectory() as tempdir:
-        input_path = os.path.join(tempdir, input_filename)
-        file.save(input_path)
-
-        output_path = os.path.join(tempdir, output_filename)
+    # The image is sent as an opened file instead of a path, so that it is not
+    # read into memory and the temporary directory is only removed after the
+    # image has been sent. A path could be passed on to a web server through
+    # X-Sendfile, which would read it after the directory has been removed.
+    tempdir = tempfile.TemporaryDirectory()
+    try:
+        input_path = os.path.join(tempdir.name, input_filename)
+        with open(input_path, "wb") as input_file:
+            shutil.copyfileobj(stream, input_file, 1 << 20)
 
+        output_path = os.path.join(tempdir.name, output_filename)
         openscad.generate_image(
             input_path=input_path,
             output_path=output_path,
         )
 
-        # While it would be possible to simply return the image as the
-        # 'output_path' variable, we are removing this tempdir at the same
-        # time we return from the function, which would not be possible if the
-        # file was open. Therefore, we read the image file into a BytesIO
-        # in-memory buffer first to use when returining the image data
-        with open(output_path, "rb") as file:
-            data = io.BytesIO(file.read())
-
-        return flask.send_file(
-            data,
-            as_attachment=True,
-            download_name=output_filename,
-        )
+        image = _TemporaryFile(output_path, tempdir)
+    except BaseException:
+        tempdir.cleanup()
+        raise
+
+    return flask.send_file(
+        image,
+        mimetype="image/png",
+        as_attachment=True,
+        download_name=output_filename,
+    )
 
 
 if __name__ == "__main__":
@@ -1,22 +1,34 @@
 # https://freecad-python-stubs.readthedocs.io/en/latest/
 
 import argparse
-import json
+import functools
 import logging
+import multiprocessing
 import os
 import platform
-import re
 import shutil
 import sys
 import tempfile
 import textwrap
+import threading
 import typing as t
+import uuid
+from concurrent.futures import ProcessPoolExecutor
 
-logging.basicConfig(
-    format="%(asctime)s %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-    level=logging.DEBUG,
-)
+# Use the faster orjson parser for JSON parameters if it is installed
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+# Only configure logging if it has not already been configured, for example by
+# the other modules of this project
+if not logging.getLogger().handlers:
+    logging.basicConfig(
+        format="%(asctime)s %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+        level=logging.DEBUG,
+    )
 
 
 # Custom Exceptions
@@ -31,151 +43,533 @@ class MeshGenerationException(Exception):
 # Change this depending on your installation or if you use Windows/Linux
 FREECAD_PATH_LINUX = "/usr/lib/freecad/lib"
 FREECAD_PATH_WINDOWS = "C:/Program Files/FreeCAD 0.20/bin"
-FREECAD_PATH = ""
+FREECAD_PATHS = {
+    "Linux": FREECAD_PATH_LINUX,
+    "Windows": FREECAD_PATH_WINDOWS,
+}
 
 SYSTEM = platform.system()
 logging.debug(f"Identified python version {sys.version}")
 logging.debug(f"Identified platform {platform.platform()}")
 
-if SYSTEM == "Linux":
-    FREECAD_PATH = FREECAD_PATH_LINUX
-elif SYSTEM == "Windows":
-    FREECAD_PATH = FREECAD_PATH_WINDOWS
-else:
+if SYSTEM not in FREECAD_PATHS:
     raise Exception(f"Unknown operating system: {SYSTEM}")
 
-logging.debug(f"Loading FreeCAD library from {FREECAD_PATH}")
-sys.path.append(FREECAD_PATH)
+FREECAD_PATH = FREECAD_PATHS[SYSTEM]
 
-# When trying to import only the Part module directly, we can get the error:
-# DLL load failed while importing Part: The specified module could not be found.
-# The solution to this is to import the FreeCAD module first:
-# https://forum.freecadweb.org/viewtopic.php?t=27740
-try:
-    import FreeCAD
-
-    logging.debug(f"Loaded FreeCAD version {FreeCAD.Version()}")
-    import Mesh
-except ImportError as e:
-    logging.warning(
-        "Unable to import FreeCAD libraries. "
-        f"Check that the FreeCAD library for {SYSTEM} exists at {FREECAD_PATH}"
-        f"\nThe following exception was raised:\n{e}"
-    )
+# The FreeCAD libraries are slow to import, so they are only imported when they
+# are first needed by _load_freecad. This lets the module be imported without
+# FreeCAD, for example in tests where its functions are mocked.
+FreeCAD = None
+Mesh = None
 
+# The FreeCAD Python bindings are not thread-safe, so this lock is held while
+# FreeCAD is used to open, modify, export or close documents. It also guards the
+# pool of opened documents below.
+_FREECAD_LOCK = threading.Lock()
 
-def get_parameters(doc: t.Union[str, "FreeCAD.Document"]):
-    if isinstance(doc, str):
-        doc = FreeCAD.open(doc)
 
-    sheet = doc.getObject("Spreadsheet")
+def _load_freecad():
+    """
+    Import the FreeCAD libraries into the global variables FreeCAD and Mesh, if
+    they have not already been imported.
+    """
+    # pylint: disable=global-statement,import-outside-toplevel,import-error
+    global FreeCAD, Mesh
+
+    if FreeCAD is not None and Mesh is not None:
+        return
+
+    logging.debug(f"Loading FreeCAD library from {FREECAD_PATH}")
+    if FREECAD_PATH not in sys.path:
+        sys.path.append(FREECAD_PATH)
+
+    # When trying to import only the Part module directly, we can get the error:
+    # DLL load failed while importing Part: The specified module could not be
+    # found. The solution to this is to import the FreeCAD module first:
+    # https://forum.freecadweb.org/viewtopic.php?t=27740
+    try:
+        import FreeCAD as _FreeCAD
+
+        logging.debug(f"Loaded FreeCAD version {_FreeCAD.Version()}")
+        import Mesh as _Mesh
+    except ImportError as e:
+        logging.warning(
+            "Unable to import FreeCAD libraries. "
+            f"Check that the FreeCAD library for {SYSTEM} exists at {FREECAD_PATH}"
+            f"\nThe following exception was raised:\n{e}"
+        )
+        raise
+
+    FreeCAD, Mesh = _FreeCAD, _Mesh
+
+
+def _get_attribute(content: str, name: str, start: int, end: int) -> t.Optional[str]:
+    """
+    Get the value of an XML attribute like name="value" within content[start:end],
+    or None if the attribute is missing, empty or contains whitespace.
+    """
+    prefix = f'{name}="'
+    value_start = content.find(prefix, start, end)
+    if value_start == -1:
+        return None
+
+    value_start += len(prefix)
+    value_end = content.find('"', value_start, end)
+    if value_end == -1:
+        return None
 
+    value = content[value_start:value_end]
+    return value if value.split() == [value] else None
+
+
+def _parse_cells(content: str) -> t.Dict[str, str]:
+    """
+    Parse the aliases and their content from the XML serialization of the cells
+    in a Spreadsheet object, where each cell is written on its own line like:
+    <Cell address="B2" content="100" displayUnit="mm" alias="length" />
+    :param content: The XML content of the cells
+    """
+    parameters = {}
+
+    # Instead of looking at every line, we jump directly between the aliases,
+    # and only look for the content within the line of each alias
+    index = content.find('alias="')
+    while index != -1:
+        line_start = content.rfind("\n", 0, index) + 1
+        line_end = content.find("\n", index)
+        if line_end == -1:
+            line_end = len(content)
+
+        alias = _get_attribute(content, "alias", line_start, line_end)
+        value = _get_attribute(content, "content", line_start, line_end)
+        if alias is not None and value is not None:
+            parameters[alias] = value
+
+        index = content.find('alias="', line_end)
+
+    return parameters
+
+
+def _parse_parameters(sheet: "FreeCAD.DocumentObject") -> t.Dict[str, str]:
+    """
+    Get the parameters (aliases) and their values from a Spreadsheet object.
+    :param sheet: The Spreadsheet object
+    """
     # Messy "hack" to get the available aliases in the Spreadsheet?
     # Might there be a better way?
-    available_parameters = {}
-    for line in sheet.cells.Content.splitlines():
-        alias = re.findall(r'alias="(\S+)"', line)
-        content = re.findall(r'content="(\S+)"', line)
-        if alias and content:
-            available_parameters[alias[0]] = content[0]
+    return _parse_cells(sheet.cells.Content)
 
-    return available_parameters
 
+@functools.lru_cache(maxsize=64)
+def _get_parameters_cached(path: str, mtime: float) -> t.Dict[str, str]:
+    # The modification time is not used here, but is part of the cache key so
+    # that cached parameters are invalidated when the file is modified
+    with _FREECAD_LOCK:
+        _load_freecad()
+        doc = FreeCAD.open(path)
+        try:
+            return get_parameters(doc=doc)
+        finally:
+            FreeCAD.closeDocument(doc.Name)
 
-def generate_mesh(
-    input_path: str,
-    output_path: str,
-    parameters: t.Optional[dict] = None,
-):
+
+def get_parameters(doc: t.Union[str, "FreeCAD.Document"]) -> t.Dict[str, str]:
     """
-    Generate a mesh from a FreeCAD file with the given parameters.
-    :param input_path: The path to the FreeCAD cad file
-    :param output_path: The output path to the resulting mesh file
-    :param parameters: A dictionary of parameters to set in the file
+    Get the parameters (aliases) and their values from the Spreadsheet object of
+    a FreeCAD document. Parameters read from a file path are cached until the
+    file is modified.
+    :param doc: The path to a FreeCAD file, or an opened FreeCAD document
+    """
+    if isinstance(doc, str):
+        path = os.path.abspath(doc)
+        # Return a copy so that callers can not modify the cached parameters
+        return dict(_get_parameters_cached(path, os.path.getmtime(path)))
+
+    return _parse_parameters(doc.getObject("Spreadsheet"))
+
+
+def _get_bodies_and_sheet(doc: "FreeCAD.Document"):
+    """
+    Get the visible Body objects and the Spreadsheet object from a document.
+    :param doc: An opened FreeCAD document
+    """
+    BODY_TYPE_ID = "PartDesign::Body"
+    SHEET_TYPE_ID = "Spreadsheet::Sheet"
+
+    logging.debug("Getting Body and Spreadsheet objects from document")
+    bodies = []
+    sheets = []
+
+    for obj in doc.Objects:
+        if obj.TypeId == BODY_TYPE_ID and obj.isElementVisible:
+            bodies.append(obj)
+
+        elif obj.TypeId == SHEET_TYPE_ID:
+            sheets.append(obj)
+
+    if not bodies:
+        raise MeshGenerationException(
+            f"Could not find any objects of the type {BODY_TYPE_ID} in the document"
+        )
+
+    if not sheets:
+        raise MeshGenerationException(
+            f"Could not find any objects of the type {SHEET_TYPE_ID} in the document"
+        )
+
+    return bodies, sheets[0]
+
+
+# Directory holding the temporary copies of FreeCAD files opened by this process,
+# created on first use and removed when the process exits
+_WORK_DIR: t.Optional[tempfile.TemporaryDirectory] = None
+
+
+def _get_work_dir() -> str:
+    """
+    Get the path to the directory holding temporary copies of FreeCAD files.
+    Must be called while holding _FREECAD_LOCK.
+    """
+    global _WORK_DIR  # pylint: disable=global-statement
+
+    if _WORK_DIR is None:
+        _WORK_DIR = tempfile.TemporaryDirectory(prefix="freecad-")
+    return _WORK_DIR.name
+
+
+def _set_parameters_bulk(
+    sheet: "FreeCAD.DocumentObject",
+    doc: "FreeCAD.Document",
+    parameters: t.Dict[str, str],
+) -> int:
+    """
+    Set several parameters in a Spreadsheet object, and then recompute the
+    document once. Recomputes are frozen while the parameters are set, so that
+    no intermediate recomputes are triggered by the individual cell updates.
+    :param sheet: The Spreadsheet object to set the parameters in
+    :param doc: The document of the Spreadsheet object
+    :param parameters: A dictionary of parameters with string values to set
+    :return: The code returned by the recompute operation
+    """
+    # Freezing recomputes is only supported by FreeCAD 0.19 and later
+    can_freeze = hasattr(doc, "RecomputesFrozen")
+    if can_freeze:
+        doc.RecomputesFrozen = True
+
+    try:
+        for parameter_name, value in parameters.items():
+            sheet.set(parameter_name, value)
+    finally:
+        if can_freeze:
+            doc.RecomputesFrozen = False
+
+    return doc.recompute()
+
+
+class _PooledDocument:
+    """
+    A FreeCAD document opened from a temporary copy of a FreeCAD file, which can
+    be reused for several mesh generations from the same file.
     """
 
-    with tempfile.TemporaryDirectory() as tempdir:
+    def __init__(self, input_path: str, mtime: float):
+        self.key = (input_path, mtime)
+
+        # Load FreeCAD before copying the file, so that no copy is left behind
+        # if it can not be loaded
+        _load_freecad()
+
         # FreeCAD will modify the file inplace if we change parameters in it
         # We don't want to modify the actual template file, so we copy it to a
-        # temporary location and use that file instead.
-        input_path = os.path.abspath(input_path)
-        input_file_name = os.path.basename(input_path)
-        temp_path = os.path.join(tempdir, input_file_name)
+        # temporary location and use that file instead. Each pooled document
+        # needs its own copy, since FreeCAD only opens a file path once.
+        temp_name = f"{uuid.uuid4().hex}_{os.path.basename(input_path)}"
+        self.temp_path = os.path.join(_get_work_dir(), temp_name)
+
+        logging.debug(f"Copying FreeCAD file at {input_path} to {self.temp_path}")
+        shutil.copyfile(input_path, self.temp_path)
+
+        logging.debug(f"Opening {self.temp_path}")
+        try:
+            self.doc = FreeCAD.open(self.temp_path)
+        except BaseException:
+            os.remove(self.temp_path)
+            raise
+
+        try:
+            self.bodies, self.sheet = _get_bodies_and_sheet(self.doc)
+        except MeshGenerationException:
+            self.close()
+            raise
+
+        # The default values of the parameters in the file, and the current
+        # values of the parameters in the document
+        self.defaults = _parse_parameters(self.sheet)
+        self.parameters = dict(self.defaults)
+
+    def close(self):
+        """Close the document and remove its temporary copy"""
+        FreeCAD.closeDocument(self.doc.Name)
+        try:
+            os.remove(self.temp_path)
+        except FileNotFoundError:
+            # The work directory may have been removed by another process
+            pass
+
+
+# Maximum number of opened documents that are kept for reuse for each file.
+# Documents released while this many are already waiting are closed instead.
+# Documents are only used while holding _FREECAD_LOCK, so one is enough.
+MAX_IDLE_DOCUMENTS = 1
+
+# Opened documents that are not currently in use, keyed by the path and
+# modification time of the file they were copied from
+_DOC_POOL: t.Dict[t.Tuple[str, float], t.List[_PooledDocument]] = {}
+
+
+def _reset_after_fork():
+    """
+    Forget the opened documents and the work directory inherited from the parent
+    process in a forked child process. The parent keeps using them, so the child
+    must not close the documents, remove their copies, or remove the directory
+    when it exits. The child opens its own documents when it needs them.
+    """
+    # pylint: disable=global-statement,protected-access
+    global _FREECAD_LOCK, _WORK_DIR
 
-        logging.debug(f"Copying FreeCAD file at {input_path} to {temp_path}")
-        shutil.copyfile(input_path, temp_path)
+    # The lock may have been held by another thread of the parent when forking
+    _FREECAD_LOCK = threading.Lock()
+    _DOC_POOL.clear()
+    if _WORK_DIR is not None:
+        _WORK_DIR._finalizer.detach()
+        _WORK_DIR = None
 
-        logging.debug(f"Opening {temp_path}")
-        doc = FreeCAD.open(temp_path)
 
-        BODY_TYPE_ID = "PartDesign::Body"
-        SHEET_TYPE_ID = "Spreadsheet::Sheet"
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
 
-        logging.debug("Getting Body and Spreadsheet objects from document")
-        bodies = []
-        sheets = []
 
-        for obj in doc.Objects:
-            if obj.TypeId == BODY_TYPE_ID and obj.isElementVisible:
-                bodies.append(obj)
+def _acquire_document(input_path: str) -> _PooledDocument:
+    """
+    Take an opened document for a FreeCAD file from the pool, or open a new one
+    if there are no documents available. Must be called while holding
+    _FREECAD_LOCK.
+    :param input_path: The absolute path to the FreeCAD file
+    """
+    key = (input_path, os.path.getmtime(input_path))
 
-            elif obj.TypeId == SHEET_TYPE_ID:
-                sheets.append(obj)
+    # Documents opened before the file was last modified are outdated
+    for pool_key in list(_DOC_POOL):
+        if pool_key[0] == input_path and pool_key != key:
+            for doc in _DOC_POOL.pop(pool_key):
+                doc.close()
+
+    docs = _DOC_POOL.get(key)
+    if docs:
+        return docs.pop()
+
+    return _PooledDocument(*key)
+
+
+def _release_document(pooled_doc: _PooledDocument):
+    """
+    Return an opened document to the pool so it can be reused, or close it if
+    the pool already holds MAX_IDLE_DOCUMENTS documents for its file. Must be
+    called while holding _FREECAD_LOCK.
+    :param pooled_doc: The document taken from the pool with _acquire_document
+    """
+    docs = _DOC_POOL.setdefault(pooled_doc.key, [])
+    if len(docs) < MAX_IDLE_DOCUMENTS:
+        docs.append(pooled_doc)
+    else:
+        pooled_doc.close()
+
+
+def preload_document(input_path: str) -> t.Dict[str, str]:
+    """
+    Open a FreeCAD file into the pool of reusable documents ahead of time, so
+    that the first mesh generation from the file does not have to open it. This
+    also loads the FreeCAD libraries and the modules needed by the document.
+    :param input_path: The path to the FreeCAD cad file
+    :return: The default parameters (aliases) and their values in the file
+    """
+    with _FREECAD_LOCK:
+        pooled_doc = _acquire_document(os.path.abspath(input_path))
+        defaults = dict(pooled_doc.defaults)
+        _release_document(pooled_doc)
+    return defaults
 
-        if not bodies:
-            raise MeshGenerationException(
-                f"Could not find any objects of the type {BODY_TYPE_ID} in the document"
-            )
 
-        if not sheets:
+def _resolve_parameters(
+    available_parameters: t.Dict[str, str],
+    parameters: t.Optional[dict],
+) -> t.Dict[str, str]:
+    """
+    Validate parameters against the parameters available in a FreeCAD file, and
+    get the values of all parameters after applying them.
+    :param available_parameters: The default parameters found in the file
+    :param parameters: A dictionary of parameters to set in the file
+    """
+    # Filter out None values
+    parameters = {k: v for k, v in (parameters or {}).items() if v is not None}
+
+    unknown_parameters = [k for k in parameters if k not in available_parameters]
+    if unknown_parameters:
+        raise MeshGenerationException(
+            f"Recieved the unknown parameters {unknown_parameters}, but found only "
+            f"the parameters {list(available_parameters)} exist in the input file."
+        )
+
+    # The spreadsheet object only accepts string values. Parameters that are
+    # not specified use their default values in the file.
+    return {
+        **available_parameters,
+        **{k: str(v) for k, v in parameters.items()},
+    }
+
+
+def _export_variant(
+    pooled_doc: _PooledDocument,
+    output_path: str,
+    new_parameters: t.Dict[str, str],
+):
+    """
+    Set the parameters of an opened document, recompute it if needed, and export
+    its mesh. The document may be left in an inconsistent state if this fails.
+    :param pooled_doc: The opened document taken from the pool
+    :param output_path: The output path to the resulting mesh file
+    :param new_parameters: The values of all parameters in the document
+    """
+    doc = pooled_doc.doc
+
+    # A document from the pool may have been used with other parameters, so
+    # we only set the parameters that differ from its current values
+    changed_parameters = {
+        k: v for k, v in new_parameters.items() if pooled_doc.parameters[k] != v
+    }
+
+    logging.debug(
+        "Skipping %d parameters that already have the requested values",
+        len(new_parameters) - len(changed_parameters),
+    )
+
+    if changed_parameters:
+        logging.debug("Setting parameter values %s", changed_parameters)
+        logging.debug("Recomputing with updated parameters %s", new_parameters)
+        recompute_code = _set_parameters_bulk(pooled_doc.sheet, doc, changed_parameters)
+        # If the document is still touched, something went wrong with the
+        # recompute and there are changes that did not go through
+        if doc.isTouched():
             raise MeshGenerationException(
-                f"Could not find any objects of the type {SHEET_TYPE_ID} in the"
-                " document"
+                "Could not recompute the document after updating parameters. "
+                f"The recompute operation returned the code {recompute_code}. "
+                f"Make sure that the parameters are valid: {new_parameters}"
             )
 
-        sheet = sheets[0]
+        pooled_doc.parameters = new_parameters
+    else:
+        logging.debug("No parameters changed, skipping recompute")
 
-        # Messy "hack" to get the available aliases in the Spreadsheet?
-        # Might there be a better way?
-        available_parameters = get_parameters(doc=doc)
-        logging.debug(f"Found default parameters {available_parameters}")
+    # Export the mesh as the specified file type
+    logging.debug("Exporting mesh to %s", output_path)
+    Mesh.export(pooled_doc.bodies, output_path)
 
-        # Set the parameters if specified
-        if parameters:
-            # Filter out None values
-            parameters = {k: v for k, v in parameters.items() if v is not None}
 
-            if not set(parameters).issubset(available_parameters):
-                raise MeshGenerationException(
-                    f"Recieved the parameters {parameters}, but found only the "
-                    f"parameters {available_parameters} exist in the input file."
-                )
+def generate_mesh_variants(
+    input_path: str,
+    variants: t.Sequence[t.Tuple[str, t.Optional[dict]]],
+):
+    """
+    Generate several meshes from the same FreeCAD file with different parameters.
+    The file is only opened once, and each variant only needs to recompute the
+    model with its parameters before exporting the mesh. Calls from several
+    threads are run one at a time, since FreeCAD is not thread-safe.
+    :param input_path: The path to the FreeCAD cad file
+    :param variants: Tuples of (output_path, parameters), with the output path
+        to a resulting mesh file and a dictionary of parameters to set for it
+    """
 
-            # The spreadsheet object only accepts string values
-            parameters = {k: str(v) for k, v in parameters.items()}
+    input_path = os.path.abspath(input_path)
+
+    with _FREECAD_LOCK:
+        # The default parameters are read from the opened document, so the file
+        # is only opened once even if it is not yet in the pool
+        pooled_doc = _acquire_document(input_path)
+        # Debug messages use lazy formatting, so that the parameter dicts are
+        # only formatted as strings when debug logging is enabled
+        logging.debug("Found default parameters %s", pooled_doc.defaults)
+
+        try:
+            # Validate the parameters of all variants before generating any
+            resolved_variants = [
+                (output_path, _resolve_parameters(pooled_doc.defaults, parameters))
+                for output_path, parameters in variants
+            ]
+        except MeshGenerationException:
+            # The document has not been modified, so it can be reused
+            _release_document(pooled_doc)
+            raise
+
+        try:
+            for output_path, new_parameters in resolved_variants:
+                _export_variant(pooled_doc, output_path, new_parameters)
+        except BaseException:
+            # The document may be left in an inconsistent state, so we close it
+            # instead of returning it to the pool
+            pooled_doc.close()
+            raise
+
+        _release_document(pooled_doc)
 
-            logging.debug(f"Setting parameter values {parameters}")
-            for parameter_name, value in parameters.items():
-                sheet.set(parameter_name, value)
 
-            new_parameters = {**available_parameters, **parameters}
-            logging.debug(f"Recomputing with updated parameters {new_parameters}")
+def generate_mesh(
+    input_path: str,
+    output_path: str,
+    parameters: t.Optional[dict] = None,
+):
+    """
+    Generate a mesh from a FreeCAD file with the given parameters.
+    :param input_path: The path to the FreeCAD cad file
+    :param output_path: The output path to the resulting mesh file
+    :param parameters: A dictionary of parameters to set in the file
+    """
+    generate_mesh_variants(input_path, [(output_path, parameters)])
 
-            recompute_code = doc.recompute()
-            # If the document is still touched, something went wrong with the
-            # recompute and there are changes that did not go through
-            if doc.isTouched():
-                raise MeshGenerationException(
-                    "Could not recompute the document after updating parameters. "
-                    f"The recompute operation returned the code {recompute_code}. "
-                    f"Make sure that the parameters are valid: {new_parameters}"
-                )
-        else:
-            logging.debug("No parameters specified, using default found in file")
 
-        # Export the mesh as the specified file type
-        logging.debug(f"Exporting mesh to {output_path}")
-        Mesh.export(bodies, output_path)
+def generate_meshes_batch(
+    jobs: t.Sequence[t.Tuple[str, str, t.Optional[dict]]],
+    max_workers: t.Optional[int] = None,
+):
+    """
+    Generate several meshes in parallel, each in a separate worker process. The
+    FreeCAD Python bindings are not thread-safe, so processes are used instead
+    of threads. Each worker keeps its own pool of opened documents, so jobs for
+    the same FreeCAD file can reuse them within a worker.
+    :param jobs: Tuples of (input_path, output_path, parameters) passed on to
+        generate_mesh
+    :param max_workers: The maximum number of worker processes, by default the
+        number of CPUs
+    """
+    if not jobs:
+        return
+
+    input_paths, output_paths, parameters = zip(*jobs)
+    max_workers = min(len(jobs), max_workers or os.cpu_count() or 1)
+
+    # The workers are spawned instead of forked. Forked workers would inherit
+    # the documents already opened by this process, and close them and remove
+    # their files on errors. They also exit without running the finalizer that
+    # removes their own work directory with the copied FreeCAD files.
+    # Each worker imports the FreeCAD libraries once when it starts.
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_load_freecad,
+    ) as executor:
+        # Consume the results to raise any exception from the workers
+        for _ in executor.map(generate_mesh, input_paths, output_paths, parameters):
+            pass
 
 
 if __name__ == "__main__":
@@ -203,6 +597,12 @@ if __name__ == "__main__":
 
             Cup with diameter 80 mm and height set to exiting dimension in model:
             {file_name} <cup.FCStd> <mesh2.stl> -p '{{"diameter": 80}}'
+
+            Cup with parameters read from a JSON file:
+            {file_name} <cup.FCStd> <mesh3.stl> --parameters-file <cup.json>
+
+            Several cups from a JSON Lines file, opening the CAD file only once:
+            {file_name} <cup.FCStd> --parameters-batch <cups.jsonl>
             """),
         formatter_class=argparse.RawTextHelpFormatter,
     )
@@ -221,17 +621,21 @@ if __name__ == "__main__":
     parser.add_argument(
         "output_path",
         type=str,
+        nargs="?",
         help=textwrap.dedent("""\
             Output path to the generated mesh file.
             The file ending determines the type of mesh, like .stl or .3mf.
             See the FreeCAD documentation for available output file types.
+            Required unless --parameters-batch is used.
             """),
     )
 
-    parser.add_argument(
+    parameters_group = parser.add_mutually_exclusive_group()
+
+    parameters_group.add_argument(
         "-p",
         "--parameters",
-        type=json.loads,
+        type=json_loads,
         required=False,
         help=textwrap.dedent("""\
             JSON string used to override existing Spreadsheet parameters.
@@ -240,10 +644,52 @@ if __name__ == "__main__":
             """),
     )
 
-    args = parser.parse_args()
+    parameters_group.add_argument(
+        "--parameters-file",
+        type=str,
+        required=False,
+        help=textwrap.dedent("""\
+            Path to a JSON file used to override existing Spreadsheet
+            parameters, formatted the same way as --parameters.
+            """),
+    )
 
-    generate_mesh(
-        input_path=args.input_path,
-        output_path=args.output_path,
-        parameters=args.parameters,
+    parameters_group.add_argument(
+        "--parameters-batch",
+        type=str,
+        required=False,
+        help=textwrap.dedent("""\
+            Path to a JSON Lines file used to generate several mesh files from
+            the same FreeCAD file, which is then only opened once. Each line
+            should be formatted as a JSON string like
+            '{\"output_path\": \"mesh.stl\", \"parameters\": {\"key1\": value1}}'.
+            """),
     )
+
+    args = parser.parse_args()
+
+    if args.parameters_batch:
+        if args.output_path is not None:
+            parser.error("output_path can not be used with --parameters-batch")
+
+        with open(args.parameters_batch, "rb") as file:
+            jobs = [json_loads(line) for line in file if line.strip()]
+
+        generate_mesh_variants(
+            input_path=args.input_path,
+            variants=[(job["output_path"], job.get("parameters")) for job in jobs],
+        )
+    else:
+        if args.output_path is None:
+            parser.error("the following arguments are required: output_path")
+
+        parameters = args.parameters
+        if args.parameters_file:
+            with open(args.parameters_file, "rb") as file:
+                parameters = json_loads(file.read())
+
+        generate_mesh(
+            input_path=args.input_path,
+            output_path=args.output_path,
+            parameters=parameters,
+        )
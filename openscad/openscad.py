@@ -1,39 +1,46 @@
 import argparse
+import collections
+import json
 import logging
 import os
+import pathlib
 import platform
 import subprocess
 import textwrap
 import typing as t
-from tempfile import TemporaryDirectory
 
-logging.basicConfig(
-    format="%(asctime)s %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-    level=logging.DEBUG,
-)
+# Only configure logging if it has not already been configured, for example by
+# the other modules of this project
+if not logging.getLogger().handlers:
+    logging.basicConfig(
+        format="%(asctime)s %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+        level=logging.DEBUG,
+    )
 
 OPENSCAD_PATH_LINUX = "/usr/bin/openscad"
 OPENSCAD_PATH_WINDOWS = "C:/Program Files/OpenSCAD/openscad.exe"
-OPENSCAD_PATH = OPENSCAD_PATH_WINDOWS
+OPENSCAD_PATHS = {
+    "Linux": OPENSCAD_PATH_LINUX,
+    "Windows": OPENSCAD_PATH_WINDOWS,
+}
 
 SYSTEM = platform.system()
 
-if SYSTEM == "Linux":
-    OPENSCAD_PATH = OPENSCAD_PATH_LINUX
-    if os.environ.get("DISPLAY") is None:
-        logging.warning(
-            "Environment variable $DISPLAY is not set. "
-            "This will cause OpenSCAD to fail when attempting to run. "
-            "If you are running in a headless environment, consider using "
-            "a virtual framebuffer program like Xvnc or Xvfb. "
-            "https://github.com/openscad/openscad/blob/master/doc/testing.txt"
-        )
-elif SYSTEM == "Windows":
-    OPENSCAD_PATH = OPENSCAD_PATH_WINDOWS
-else:
+if SYSTEM not in OPENSCAD_PATHS:
     raise Exception(f"Unknown operating system: ''{SYSTEM}")
 
+OPENSCAD_PATH = OPENSCAD_PATHS[SYSTEM]
+
+if SYSTEM == "Linux" and os.environ.get("DISPLAY") is None:
+    logging.warning(
+        "Environment variable $DISPLAY is not set. "
+        "This will cause OpenSCAD to fail when attempting to run. "
+        "If you are running in a headless environment, consider using "
+        "a virtual framebuffer program like Xvnc or Xvfb. "
+        "https://github.com/openscad/openscad/blob/master/doc/testing.txt"
+    )
+
 
 # Custom Exceptions
 class ImageGenerationException(Exception):
@@ -51,50 +58,81 @@ def generate_image(
     :param output_path: Path to the output PNG file
     :param size: Tuple on the form (width, height) specifying the image size
     """
-    input_path = os.path.abspath(input_path)
-    output_path = os.path.abspath(output_path)
-
-    with TemporaryDirectory() as tempdir:
-        tempfile = os.path.join(tempdir, "export.scad")
-
-        with open(tempfile, "w", encoding="utf-8") as file:
-            file.write(f'import("{input_path}", convexity=1);'.replace("\\", "/"))
-
-        size_str = f"{size[0]},{size[1]}"
-
-        cmd = [
-            OPENSCAD_PATH,
-            "-o",
-            output_path,
-            "--autocenter",
-            "--viewall",
-            f"--imgsize={size_str}",
-            tempfile,
-        ]
-
-        logging.info(f"Executing command: {cmd}")
-
-        process = subprocess.run(
-            cmd,
-            text=True,
-            check=False,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
+    if not os.path.isabs(input_path):
+        input_path = os.path.abspath(input_path)
+    if not os.path.isabs(output_path):
+        output_path = os.path.abspath(output_path)
+
+    # The script importing the STL file is passed to OpenSCAD through stdin,
+    # which avoids writing it to a temporary file first. OpenSCAD reads scripts
+    # as UTF-8, so we encode it ourselves instead of using the locale encoding.
+    # The path is quoted with json.dumps, which escapes quotes and backslashes
+    # the same way as OpenSCAD string literals
+    posix_path = pathlib.PurePath(input_path).as_posix()
+    script = f"import({json.dumps(posix_path, ensure_ascii=False)}, convexity=1);"
+    script_bytes = script.encode("utf-8")
+
+    size_str = f"{size[0]},{size[1]}"
+
+    cmd = [
+        OPENSCAD_PATH,
+        "-o",
+        output_path,
+        "--autocenter",
+        "--viewall",
+        f"--imgsize={size_str}",
+        # Read the input script from stdin
+        "-",
+    ]
+
+    logging.info(f"Executing command: {cmd}")
+
+    # The output is scanned line by line while OpenSCAD runs, keeping only the
+    # last lines for error messages instead of buffering all of it in memory
+    had_error = False
+    last_lines = collections.deque(maxlen=32)
+
+    # File descriptors are not closed in the child process. Closing them means
+    # iterating over every possible descriptor before starting OpenSCAD, which
+    # is slow in a service with many open files, and prevents CPython from using
+    # the faster posix_spawn. Descriptors opened by Python are non-inheritable
+    # by default (PEP 446), so this only passes on descriptors that have been
+    # explicitly made inheritable, which is acceptable for the local OpenSCAD.
+    with subprocess.Popen(
+        cmd,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        close_fds=False,
+    ) as process:
+        try:
+            process.stdin.write(script_bytes)
+            process.stdin.close()
+        except BrokenPipeError:
+            # OpenSCAD exited before reading the script, see the output below
+            pass
+
+        for line in process.stdout:
+            line = line.decode("utf-8", errors="replace")
+            had_error = had_error or "ERROR:" in line
+            last_lines.append(line)
+
+    output = "".join(last_lines)
+
+    if process.returncode != 0:
+        raise ImageGenerationException(
+            f"Openscad returned with code {process.returncode}. "
+            f"See the last lines of the output:\n{output}"
         )
 
-        if process.returncode != 0:
-            raise ImageGenerationException(
-                f"Openscad returned with code {process.returncode}. "
-                f"See the output:\n{process.stdout}"
-            )
-
-        if "ERROR:" in process.stdout:
-            if os.path.exists(output_path):
-                os.remove(output_path)
+    if had_error:
+        if os.path.exists(output_path):
+            os.remove(output_path)
 
-            raise ImageGenerationException(
-                f"The command encounterd an error. See the output:\n{process.stdout}"
-            )
+        raise ImageGenerationException(
+            "The command encounterd an error. "
+            f"See the last lines of the output:\n{output}"
+        )
 
 
 if __name__ == "__main__":
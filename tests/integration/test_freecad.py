@@ -19,6 +19,17 @@ def test_get_parameters():
     assert expected_parameters == actual_parameters
 
 
+@pytest.mark.integration
+def test_preload_document():
+    input_path = "tests/assets/block.FCStd"
+
+    expected_parameters = freecad.get_parameters(doc=input_path)
+
+    actual_parameters = freecad.preload_document(input_path=input_path)
+
+    assert expected_parameters == actual_parameters
+
+
 @pytest.mark.integration
 def test_generate_mesh(tmpdir: str):
     input_path = "tests/assets/block.FCStd"
@@ -37,3 +48,87 @@ def test_generate_mesh(tmpdir: str):
     )
 
     assert stl.Mesh.from_file(output_path)
+
+
+@pytest.mark.integration
+def test_generate_meshes_batch(tmpdir: str):
+    input_path = "tests/assets/block.FCStd"
+
+    jobs = [
+        (input_path, os.path.join(tmpdir, "block_0.stl"), {"length": "10"}),
+        (input_path, os.path.join(tmpdir, "block_1.stl"), {"length": "20"}),
+    ]
+
+    freecad.generate_meshes_batch(jobs=jobs, max_workers=2)
+
+    for _, output_path, _ in jobs:
+        assert stl.Mesh.from_file(output_path)
+
+
+@pytest.mark.integration
+def test_generate_mesh_reused_document(tmpdir: str):
+    input_path = "tests/assets/block.FCStd"
+
+    # The same document is reused, so each mesh must only depend on its own
+    # parameters and not on the parameters set for the previous mesh
+    variants = [
+        {"length": "10", "width": "20", "height": "30"},
+        {"length": "40", "width": "20", "height": "60"},
+        None,
+    ]
+    expected_dimensions = [
+        [10, 20, 30],
+        [20, 40, 60],
+        [100, 200, 300],
+    ]
+
+    for i, (parameters, expected) in enumerate(zip(variants, expected_dimensions)):
+        output_path = os.path.join(tmpdir, f"block_{i}.stl")
+
+        freecad.generate_mesh(
+            input_path=input_path,
+            output_path=output_path,
+            parameters=parameters,
+        )
+
+        mesh = stl.Mesh.from_file(output_path)
+        dimensions = sorted(mesh.max_ - mesh.min_)
+        assert dimensions == pytest.approx(expected)
+
+
+@pytest.mark.integration
+def test_generate_mesh_variants(tmpdir: str):
+    input_path = "tests/assets/block.FCStd"
+
+    variants = [
+        (os.path.join(tmpdir, "block_0.stl"), {"length": "10"}),
+        (os.path.join(tmpdir, "block_1.stl"), {"length": "20"}),
+    ]
+
+    expected_dimensions = [
+        [10, 200, 300],
+        [20, 200, 300],
+    ]
+
+    freecad.generate_mesh_variants(input_path=input_path, variants=variants)
+
+    for (output_path, _), expected in zip(variants, expected_dimensions):
+        mesh = stl.Mesh.from_file(output_path)
+        assert sorted(mesh.max_ - mesh.min_) == pytest.approx(expected)
+
+
+@pytest.mark.integration
+def test_generate_mesh_variants_invalid_parameters(tmpdir: str):
+    input_path = "tests/assets/block.FCStd"
+
+    variants = [
+        (os.path.join(tmpdir, "block_0.stl"), {"length": "10"}),
+        (os.path.join(tmpdir, "block_1.stl"), {"unknown": "20"}),
+    ]
+
+    # All variants are validated before any of them is generated
+    with pytest.raises(freecad.MeshGenerationException):
+        freecad.generate_mesh_variants(input_path=input_path, variants=variants)
+
+    for output_path, _ in variants:
+        assert not os.path.exists(output_path)
@@ -0,0 +1,60 @@
+from freecad import freecad
+
+
+def test_parse_cells():
+    """
+    Test parsing aliases and their content from the cells of a Spreadsheet
+    """
+    content = (
+        '<Cells Count="4" xlink="1">\n'
+        '<Cell address="A1" content="Length" />\n'
+        '<Cell address="B1" content="100" displayUnit="mm" alias="length" />\n'
+        '<Cell address="B2" alias="width" content="200" />\n'
+        '<Cell address="B3" content="300" alias="height" />\n'
+        "</Cells>\n"
+    )
+
+    assert freecad._parse_cells(content) == {
+        "length": "100",
+        "width": "200",
+        "height": "300",
+    }
+
+
+def test_parse_cells_invalid_content():
+    """
+    Test that aliases with empty content, or content containing whitespace, are
+    not parsed as parameters
+    """
+    content = (
+        '<Cell address="B1" content="" alias="empty" />\n'
+        '<Cell address="B2" content="=length + 1" alias="formula" />\n'
+        '<Cell address="B3" alias="missing" />\n'
+        '<Cell address="B4" content="100" alias="length" />\n'
+    )
+
+    assert freecad._parse_cells(content) == {"length": "100"}
+
+
+def test_parse_cells_line_endings():
+    """
+    Test parsing cells with Windows line endings and without a trailing newline
+    """
+    content = (
+        '<Cell address="B1" content="100" alias="length" />\r\n'
+        '<Cell address="B2" content="200" alias="width" />'
+    )
+
+    assert freecad._parse_cells(content) == {"length": "100", "width": "200"}
+
+
+def test_get_attribute():
+    """
+    Test getting an attribute only within the given range of the content
+    """
+    content = '<Cell content="100" alias="length" />\n<Cell alias="width" />'
+    line_end = content.index("\n")
+
+    assert freecad._get_attribute(content, "content", 0, line_end) == "100"
+    assert freecad._get_attribute(content, "alias", 0, line_end) == "length"
+    assert freecad._get_attribute(content, "content", line_end, len(content)) is None
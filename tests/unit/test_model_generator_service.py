@@ -1,9 +1,13 @@
 import json
 import os
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
 from app import model_generator_service
+from freecad import freecad
+from openscad import openscad
 
 
 class MockModel:
@@ -36,8 +40,12 @@ def fixture_test_client(tmpdir, mocker):
 
     model_generator_service.OUTPUT_DIR = tmpdir
     model_generator_service.MODELS = [MockModel.name]
+    model_generator_service.MODELS_SET = frozenset(model_generator_service.MODELS)
     model_generator_service.MODEL_PATHS = {MockModel.name: MockModel.cad_path}
     model_generator_service.MODEL_PARAMS = {MockModel.name: MockModel.parameters}
+    model_generator_service.MODELS_JSON = model_generator_service.app.json.dumps(
+        model_generator_service.MODEL_PARAMS
+    ).encode()
 
     def _generate_mesh(input_path, output_path, parameters):
         with open(output_path, "w", encoding="utf-8") as file:
@@ -51,10 +59,16 @@ def fixture_test_client(tmpdir, mocker):
     mocker.patch("freecad.freecad.generate_mesh", side_effect=_generate_mesh)
     mocker.patch("openscad.openscad.generate_image", side_effect=_generate_image)
 
+    # Use a separate pool for images rendered in the background, so that we can
+    # wait for them to finish before the mocked functions are restored
+    model_generator_service._RENDER_POOL = ThreadPoolExecutor(max_workers=2)
+
     # Create a test client using the Flask application configured for testing
     with model_generator_service.app.test_client() as testing_client:
         yield testing_client
 
+    model_generator_service._RENDER_POOL.shutdown(wait=True)
+
 
 def assert_json_equal(left: dict, right: dict):
     """
@@ -96,6 +110,65 @@ def test_submit_parameters(test_client):
     assert response.status_code == HTTP_OK
 
 
+def test_submit_parameters_image_ready(test_client):
+    """
+    Test that the preview image rendered in the background for a generated model
+    is eventually reported as ready
+    """
+    response = test_client.post(
+        "/submit_parameters",
+        content_type="multipart/form-data",
+        data={"selected_model": MockModel.name, **MockModel.parameters},
+    )
+    assert response.status_code == HTTP_OK
+
+    image_ready_link = re.search(r'fetch\("([^"]+)"\)', response.get_data(True))[1]
+
+    for _ in range(100):
+        response = test_client.get(image_ready_link)
+        assert response.status_code == HTTP_OK
+        if not response.json["pending"]:
+            break
+        time.sleep(0.01)
+
+    assert response.json["ready"]
+
+
+def test_submit_parameters_image_failed(test_client):
+    """
+    Test that a preview image is rendered again if a previous render failed
+    after partially writing the image
+    """
+
+    def _generate_image_failing(input_path, output_path):
+        with open(output_path, "w", encoding="utf-8") as file:
+            file.write("partial")
+        raise openscad.ImageGenerationException("Mock failure")
+
+    openscad.generate_image.side_effect = _generate_image_failing
+    response = test_client.post(
+        "/submit_parameters",
+        content_type="multipart/form-data",
+        data={"selected_model": MockModel.name, **MockModel.parameters},
+    )
+    assert response.status_code == HTTP_OK
+
+    # Wait for the background render to fail
+    model_generator_service._RENDER_POOL.shutdown(wait=True)
+    model_generator_service._RENDER_POOL = ThreadPoolExecutor(max_workers=2)
+    assert not any(
+        name.endswith(".png") for name in os.listdir(model_generator_service.OUTPUT_DIR)
+    )
+
+    response = test_client.post(
+        "/submit_parameters",
+        content_type="multipart/form-data",
+        data={"selected_model": MockModel.name, **MockModel.parameters},
+    )
+    assert response.status_code == HTTP_OK
+    assert re.search(r'fetch\("([^"]+)"\)', response.get_data(True))
+
+
 # Test API endpoints
 def test_api_health(test_client):
     """
@@ -140,6 +213,73 @@ def test_api_generate_download_link(test_client):
     assert os.path.exists(generated_file_path)
 
 
+def test_api_generate_download_link_cached(test_client):
+    """
+    Test that repeated requests with the same parameters reuse the generated mesh
+    """
+    for _ in range(2):
+        response = test_client.post(
+            "/api/generate_download_link",
+            json={"model": MockModel.name, "parameters": MockModel.parameters},
+        )
+        assert response.status_code == HTTP_OK
+
+    assert freecad.generate_mesh.call_count == 1
+
+
+def test_api_generate_download_link_failed(test_client):
+    """
+    Test that a mesh is generated again if a previous attempt failed after
+    partially writing the mesh
+    """
+    generate_mesh = freecad.generate_mesh.side_effect
+
+    def _generate_mesh_failing(input_path, output_path, parameters):
+        with open(output_path, "w", encoding="utf-8") as file:
+            file.write("partial")
+        raise freecad.MeshGenerationException("Mock failure")
+
+    freecad.generate_mesh.side_effect = _generate_mesh_failing
+    response = test_client.post(
+        "/api/generate_download_link",
+        json={"model": MockModel.name, "parameters": MockModel.parameters},
+    )
+    assert response.status_code == 500
+    assert not os.listdir(model_generator_service.OUTPUT_DIR)
+
+    freecad.generate_mesh.side_effect = generate_mesh
+    response = test_client.post(
+        "/api/generate_and_send",
+        json={"model": MockModel.name, "parameters": MockModel.parameters},
+    )
+    assert response.status_code == HTTP_OK
+    assert response.get_data(as_text=True) == MockModel.output_file_contents
+    assert freecad.generate_mesh.call_count == 2
+
+
+def test_api_generate_download_link_model_modified(test_client, tmpdir):
+    """
+    Test that modifying the CAD model invalidates the previously generated mesh
+    """
+    cad_path = os.path.join(tmpdir, "block.FCStd")
+    with open(cad_path, "w", encoding="utf-8") as file:
+        file.write("mock_model_contents")
+    model_generator_service.MODEL_PATHS = {MockModel.name: cad_path}
+
+    download_links = []
+    for mtime in (1000, 2000):
+        os.utime(cad_path, (mtime, mtime))
+        response = test_client.post(
+            "/api/generate_download_link",
+            json={"model": MockModel.name, "parameters": MockModel.parameters},
+        )
+        assert response.status_code == HTTP_OK
+        download_links.append(response.json["link"])
+
+    assert freecad.generate_mesh.call_count == 2
+    assert download_links[0] != download_links[1]
+
+
 def test_api_generate_and_send(test_client):
     """
     Test API endpoint to generate a model and return it as an attachment in the response
@@ -186,3 +326,51 @@ def test_generate_image(test_client):
 
     # Dummy file with text content and not a true PNG file
     assert response.get_data(as_text=True) == "mock_image_contents"
+
+    # The image is only kept in a temporary directory until it has been sent
+    response.close()
+    output_path = openscad.generate_image.call_args.kwargs["output_path"]
+    assert not os.path.exists(os.path.dirname(output_path))
+    assert not os.path.exists(model_generator_service.OUTPUT_DIR) or not any(
+        name.endswith(".png") for name in os.listdir(model_generator_service.OUTPUT_DIR)
+    )
+
+
+def test_generate_image_raw_body(test_client):
+    """
+    Test the API endpoint to generate a image from a STL file sent as the raw
+    request body
+    """
+    with open("tests/assets/test.stl", "rb") as file:
+        data = file.read()
+
+    response = test_client.post(
+        "/api/generate_image",
+        query_string={"filename": "test.stl"},
+        data=data,
+        content_type="application/octet-stream",
+    )
+
+    assert response.status_code == HTTP_OK
+
+    content_disposition = response.headers.get("Content-Disposition")
+    file_name = content_disposition.split("filename=")[1]
+
+    assert file_name == "test.png"
+
+    # Dummy file with text content and not a true PNG file
+    assert response.get_data(as_text=True) == "mock_image_contents"
+
+    # Names that are not usable as file names fall back to a default name
+    for filename in ("", "..", "uploads/"):
+        response = test_client.post(
+            "/api/generate_image",
+            query_string={"filename": filename},
+            data=data,
+            content_type="application/octet-stream",
+        )
+
+        assert response.status_code == HTTP_OK
+
+        content_disposition = response.headers.get("Content-Disposition")
+        assert content_disposition.split("filename=")[1] == "model.png"